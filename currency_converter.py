@@ -1,8 +1,9 @@
 # Import required modules
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton, QComboBox
-from PyQt6.QtCore import QCoreApplication
+from PyQt6.QtGui import QStandardItemModel, QStandardItem
+from PyQt6.QtCore import Qt, QCoreApplication, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
 from exchange_rates_api import ExchangeRatesApi
-import re
+import math
 
 # A dictionary mapping ISO currency codes to their respective symbols for display purposes.
 currency_symbols = {
@@ -13,26 +14,80 @@ currency_symbols = {
     'CHF': 'CHF',
 }
 
+# Currencies offered in the source and target selectors, in display order.
+CURRENCIES = ('PLN', 'EUR', 'USD', 'CHF', 'GBP')
+
+# Application-wide style sheet; widgets are matched by object name so Qt parses the rules once.
+STYLE_SHEET = """
+QWidget { font-family: Arial; background-color: #F5F5F5; }
+QLineEdit#amountInput { font-size: 16px; }
+QComboBox, QComboBox QAbstractItemView { font-size: 14px; background-color: #E8E8E8; }
+QPushButton#convertButton { background-color: #4CAF50; color: white; font-size: 16px; }
+QPushButton#swapButton { background-color: #2196F3; color: white; font-size: 14px; }
+QPushButton#convertButton:disabled, QPushButton#swapButton:disabled { background-color: #BDBDBD; color: #757575; }
+QLabel#resultLabel { color: #333333; font-size: 18px; }
+"""
+
+# Plain-text template for the conversion result, so the label skips rich-text parsing on every update.
+RESULT_TEMPLATE = (
+    "{amount:.2f} {source} = {result:.2f} {target}\n"
+    "Rate 1 {source} = {rate:.4f} {target}"
+)
+
+# Line appended to the result once the date of the exchange rates is known.
+RATE_DATE_TEMPLATE = "\nAccording to the exchange rate from {date}"
+
+# Signals used by RatesFetcher to hand the fetched rates back to the UI thread
+class RatesFetcherSignals(QObject):
+    finished = pyqtSignal(dict, str)
+    failed = pyqtSignal(str)
+
+# Background task fetching exchange rates so the Qt event loop never blocks on the network
+class RatesFetcher(QRunnable):
+    def __init__(self, api):
+        super().__init__()
+        self.api = api
+        self.signals = RatesFetcherSignals()
+
+    # Any error is reported through failed, so the UI always learns that the fetch has ended
+    def run(self):
+        try:
+            rates, update_date = self.api.fetch_exchange_rates()
+            if rates:
+                self.signals.finished.emit(rates, update_date)
+                return
+        except Exception as e:
+            print("Error fetching exchange rates: ", e)
+        self.signals.failed.emit("Unable to fetch exchange rates. Please try again later.")
+
 # Main class for the currency converter application
 class CurrencyConverter(QWidget):
-    # Extracts and returns the ISO currency code (three uppercase letters) from the currency label.
-    def extract_currency_code(self, currency_label):
-        match = re.match(r"([A-Z]{3})", currency_label)
-        return match.group(0) if match else None
-    
+    # Emitted with (rates, update_date) whenever new exchange rates have been stored
+    ratesUpdated = pyqtSignal(dict, str)
+
     # Initialize the application with an API key
+    # The first rates fetch is queued for the event loop so it never delays showing the window
     def __init__(self, api_key):
         super().__init__()
         self.api = ExchangeRatesApi(api_key)
-        self.exchange_rates = self.api.fetch_exchange_rates()
-        self.initialize_ui()
-        self.last_converted_value = None
+        self.exchange_rates = {}
+        self.pair_rates = {}
         self.last_update_date = ""
+        self.last_converted_value = None
+        self.displayed_conversion = None
+        self.fetch_in_progress = False
+        self.initialize_ui()
+        self.ratesUpdated.connect(self.on_rates_updated)
+        QTimer.singleShot(0, self.request_exchange_rates)
+
+    # Close the API client's own HTTP session together with the window
+    def closeEvent(self, event):
+        self.api.close()
+        super().closeEvent(event)
 
     # Set up the initial user interface
     def initialize_ui(self):
         self.setWindowTitle('Currency Converter')
-        self.setStyleSheet("font-family: Arial; background-color: #F5F5F5;")
         self.setup_layout()
         self.center_window()
     
@@ -54,83 +109,188 @@ class CurrencyConverter(QWidget):
 
     # Set up input widgets for the user interface
     def setup_input_widgets(self, layout):
-        self.amountInput = self.create_line_edit('Enter amount', "font-size: 16px;")
+        self.amountInput = self.create_line_edit('Enter amount', 'amountInput')
         layout.addWidget(self.amountInput)
         self.amountInput.returnPressed.connect(self.on_convert)
-        currencies = ['PLN', 'EUR', 'USD', 'CHF', 'GBP']
-        self.sourceCurrencySelector = self.create_combo_box(currencies, "font-size: 14px; background-color: #E8E8E8;")
-        self.targetCurrencySelector = self.create_combo_box(currencies, "font-size: 14px; background-color: #E8E8E8;")
+        self.currencyModel = self.create_currency_model()
+        self.sourceCurrencySelector = self.create_combo_box(self.currencyModel, 'sourceCurrencySelector')
+        self.targetCurrencySelector = self.create_combo_box(self.currencyModel, 'targetCurrencySelector')
         layout.addWidget(self.sourceCurrencySelector)
         layout.addWidget(self.targetCurrencySelector)
-        self.convertButton = self.create_button('Convert', "background-color: #4CAF50; color: white; font-size: 16px;")
+        self.convertButton = self.create_button('Convert', 'convertButton', self.on_convert)
         layout.addWidget(self.convertButton)
 
     # Set up the result label for the user interface
     def setup_result_label(self, layout):
         self.resultLabel = QLabel('')
-        self.resultLabel.setStyleSheet("color: #333333; font-size: 18px;")
+        self.resultLabel.setObjectName('resultLabel')
+        self.resultLabel.setTextFormat(Qt.TextFormat.PlainText)
         layout.addWidget(self.resultLabel)
 
     # Create a line edit widget
-    def create_line_edit(self, placeholder, style):
+    def create_line_edit(self, placeholder, object_name):
         line_edit = QLineEdit(self)
         line_edit.setPlaceholderText(placeholder)
-        line_edit.setStyleSheet(style)
+        line_edit.setObjectName(object_name)
         return line_edit
 
+    # Create the item model shared by both currency selectors
+    # Each item stores its ISO code as user data, so selectors return it via currentData()
+    def create_currency_model(self):
+        model = QStandardItemModel(self)
+        for currency in CURRENCIES:
+            symbol = currency_symbols.get(currency, '')
+            item = QStandardItem(f"{currency} ({symbol})")
+            item.setData(currency, Qt.ItemDataRole.UserRole)
+            model.appendRow(item)
+        return model
+
     # Create a combo box widget
-    def create_combo_box(self, items, style):
+    def create_combo_box(self, model, object_name):
         combo_box = QComboBox(self)
-        for item in items:
-            symbol = currency_symbols.get(item, '')
-            combo_box.addItem(f"{item} ({symbol})")
-        combo_box.setStyleSheet(style)
+        combo_box.setModel(model)
+        combo_box.setObjectName(object_name)
         return combo_box
 
-    # Create a button widget
-    def create_button(self, text, style):
+    # Create a button widget that calls on_click when pressed
+    def create_button(self, text, object_name, on_click):
         button = QPushButton(text, self)
-        button.setStyleSheet(style)
-        button.clicked.connect(self.on_convert)
+        button.setObjectName(object_name)
+        button.clicked.connect(on_click)
         return button
     
     # Set up the swap button
     def setup_swap_button(self, layout):
-        self.swapButton = self.create_button('Swap', "background-color: #2196F3; color: white; font-size: 14px;")
-        self.swapButton.clicked.connect(self.on_swap)
+        self.swapButton = self.create_button('Swap', 'swapButton', self.on_swap)
         layout.addWidget(self.swapButton)
         
     # Swap the values of source and target currency selectors
+    # While the input still holds the amount of the conversion on display and the rates are fresh,
+    # that conversion's result becomes the new amount, so the previous result is converted back
     def on_swap(self):
+        source_currency = self.sourceCurrencySelector.currentData()
+        target_currency = self.targetCurrencySelector.currentData()
+        conversion = self.displayed_conversion
+        convert_back = (conversion is not None and self.api.has_fresh_rates()
+                        and conversion[:3] == (self.parse_amount(), source_currency, target_currency))
         source_index = self.sourceCurrencySelector.currentIndex()
         target_index = self.targetCurrencySelector.currentIndex()
         self.sourceCurrencySelector.setCurrentIndex(target_index)
         self.targetCurrencySelector.setCurrentIndex(source_index)
-        if self.last_converted_value is not None:
-            self.amountInput.setText(str(self.last_converted_value))
+        if convert_back:
+            self.amountInput.setText(f"{self.last_converted_value:.2f}")
         self.on_convert()
 
     # Handle the conversion process when the convert button is clicked
+    # The amount is validated first, so an invalid entry never starts a fetch
+    # While the loaded rates are still fresh, the conversion is shown without starting a fetch
+    # Converting a currency into itself needs no rates at all
     def on_convert(self):
-        input_text = self.amountInput.text().strip().replace(',', '.')
+        input_text = self.amountInput.text().strip()
         if not input_text:
-            self.resultLabel.setText("Please enter an amount to convert.")
+            self.show_message("Please enter an amount to convert.")
             return
+        if self.parse_amount() is None:
+            self.show_message("Please enter a valid amount.")
+            return
+        same_currency = self.sourceCurrencySelector.currentData() == self.targetCurrencySelector.currentData()
+        if same_currency or (self.exchange_rates and self.api.has_fresh_rates()):
+            self.show_conversion()
+            return
+        self.request_exchange_rates()
+
+    # Fetch the exchange rates in the background; on_rates_fetched runs once they arrive
+    # Only one fetch runs at a time, so repeated clicks do not pile up requests
+    def request_exchange_rates(self):
+        if self.fetch_in_progress:
+            return
+        self.set_fetch_in_progress(True)
+        fetcher = RatesFetcher(self.api)
+        fetcher.signals.finished.connect(self.on_rates_fetched)
+        fetcher.signals.failed.connect(self.on_rates_failed)
+        QThreadPool.globalInstance().start(fetcher)
+
+    # Disable the buttons that trigger a fetch while one is already running
+    def set_fetch_in_progress(self, in_progress):
+        self.fetch_in_progress = in_progress
+        self.convertButton.setEnabled(not in_progress)
+        self.swapButton.setEnabled(not in_progress)
+
+    # Store the fetched rates and notify everything that depends on them
+    def on_rates_fetched(self, rates, update_date):
+        self.set_fetch_in_progress(False)
+        self.exchange_rates, self.last_update_date = rates, update_date
+        self.update_pair_rates()
+        self.ratesUpdated.emit(rates, update_date)
+
+    # Show the conversion for the entered amount with the newly stored rates
+    def on_rates_updated(self, rates, update_date):
+        if self.amountInput.text().strip():
+            self.show_conversion()
+
+    # Report a failed fetch to the user
+    def on_rates_failed(self, message):
+        self.set_fetch_in_progress(False)
+        self.show_message(message)
+
+    # Show a status or error message in place of the conversion result
+    # The label is left untouched when it already shows the message, avoiding a needless relayout
+    def show_message(self, message):
+        self.displayed_conversion = None
+        if self.resultLabel.text() != message:
+            self.resultLabel.setText(message)
+
+    # Return the entered amount as a float, accepting a decimal comma
+    # Only finite, non-negative amounts are accepted; anything else gives None
+    def parse_amount(self):
+        input_text = self.amountInput.text().strip()
+        if ',' in input_text:
+            input_text = input_text.replace(',', '.')
         try:
-            self.exchange_rates, self.last_update_date = self.api.fetch_exchange_rates()
             amount = float(input_text)
-            source_currency_label = self.sourceCurrencySelector.currentText()
-            target_currency_label = self.targetCurrencySelector.currentText()
-            source_currency = self.extract_currency_code(source_currency_label)
-            target_currency = self.extract_currency_code(target_currency_label)
-            result = self.convert_currency(amount, source_currency, target_currency)
-            exchange_rate = self.exchange_rates.get(target_currency) / self.exchange_rates.get(source_currency)
-            self.resultLabel.setText(f"{amount:.2f} <b>{source_currency}</b> = {result:.2f} <b>{target_currency}</b><br>Rate 1 <b>{source_currency}</b> = {exchange_rate:.4f} <b>{target_currency}</b><br>According to the exchange rate from {self.last_update_date}")
         except ValueError:
-            self.resultLabel.setText("Please enter a valid amount.")
+            return None
+        return amount if amount >= 0 and math.isfinite(amount) else None
+
+    # Convert the entered amount with the current exchange rates and display the result
+    def show_conversion(self):
+        amount = self.parse_amount()
+        if amount is None:
+            self.show_message("Please enter a valid amount.")
+            return
+        self.display_conversion(amount, self.sourceCurrencySelector.currentData(), self.targetCurrencySelector.currentData())
 
-    # Perform the currency conversion calculation
-    def convert_currency(self, amount, source_currency, target_currency):
-        source_rate = self.exchange_rates.get(source_currency, 1)
-        target_rate = self.exchange_rates.get(target_currency, 1)
-        return amount * (target_rate / source_rate)
\ No newline at end of file
+    # Convert the amount between the given currencies and display the result
+    # Formatting and relabelling are skipped when the label already shows this exact conversion
+    # The rate date line is left out while no date is known, e.g. for a same-currency conversion before the first fetch
+    def display_conversion(self, amount, source_currency, target_currency):
+        exchange_rate = self.get_exchange_rate(source_currency, target_currency)
+        result = amount * exchange_rate
+        self.last_converted_value = result
+        conversion = (amount, source_currency, target_currency, exchange_rate, self.last_update_date)
+        if conversion == self.displayed_conversion:
+            return
+        self.displayed_conversion = conversion
+        text = RESULT_TEMPLATE.format(
+            amount=amount, source=source_currency, result=result, target=target_currency, rate=exchange_rate)
+        if self.last_update_date:
+            text += RATE_DATE_TEMPLATE.format(date=self.last_update_date)
+        self.resultLabel.setText(text)
+
+    # Precompute the exchange rate between every pair of offered currencies after a fetch
+    def update_pair_rates(self):
+        rates = self.exchange_rates
+        self.pair_rates = {
+            (source, target): rates[target] / rates[source]
+            for source in CURRENCIES if rates.get(source)
+            for target in CURRENCIES if target in rates
+        }
+
+    # Return the rate converting one unit of the source currency into the target currency
+    def get_exchange_rate(self, source_currency, target_currency):
+        if source_currency == target_currency:
+            return 1.0
+        try:
+            return self.pair_rates[(source_currency, target_currency)]
+        except KeyError:
+            return self.exchange_rates.get(target_currency, 1) / self.exchange_rates.get(source_currency, 1)
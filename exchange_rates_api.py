@@ -1,26 +1,216 @@
 import requests
+from http_session import create_session
+import hashlib
 import json
+import os
+import stat
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# orjson encodes and decodes JSON noticeably faster; fall back to the stdlib json module without it
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Encode a JSON document to bytes
+def _dumps(data):
+    return orjson.dumps(data) if orjson else json.dumps(data).encode()
+
+# Decode a JSON document from bytes
+def _loads(payload):
+    return orjson.loads(payload) if orjson else json.loads(payload)
+
+# Short digest used to tell whether the cache file content would change
+def _content_hash(payload):
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+# Process umask, read once at import so new cache files get the usual permissions
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# Currency all API rates are quoted against
+BASE_CURRENCY = 'USD'
+
+# Seconds to wait for the connection and for the response; a short connect timeout keeps offline fetches quick
+REQUEST_TIMEOUT = (3, 10)
 
 # Class handling communication with the Exchange Rates API
 class ExchangeRatesApi:
-    def __init__(self, api_key):
+    # Without a session the instance creates its own, which close() releases
+    # A session passed in, such as http_session.get_session(), stays open for the caller's other users
+    # cache_ttl is how many seconds fetched rates are served from memory before the API is asked again
+    def __init__(self, api_key, session=None, cache_ttl=600):
         self.api_key = api_key
+        self._owns_session = session is None
+        self.session = create_session() if session is None else session
         self.cache_file = 'exchange_rates_cache.json'
+        self.cache_ttl = cache_ttl
+        self._cached_rates = None
+        self._fetch_ts = 0.0
+        self._cache_hash = None
+        self._cache_meta = None
+        self._force_refresh = False
+
+    # Release the pooled connections of a session created by this instance
+    def close(self):
+        if self._owns_session:
+            self.session.close()
+
+    # Allow "with ExchangeRatesApi(key) as api:" so the session the instance created is closed on exit
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Drop the held rates and validators so the next fetch_exchange_rates call asks the API unconditionally
+    # The today's-cache shortcut is skipped until that request succeeds
+    def invalidate(self):
+        self._cached_rates = None
+        self._fetch_ts = 0.0
+        self._cache_meta = None
+        self._force_refresh = True
+
+    # Check whether fetch_exchange_rates would currently answer from the in-memory cache
+    def has_fresh_rates(self):
+        return self._cached_rates is not None and time.monotonic() - self._fetch_ts < self.cache_ttl
 
     # Function to fetch and return exchange rates from the API
+    # Rates fetched within the last cache_ttl seconds are returned from memory
+    # On the first call, a disk cache already holding today's rates is used without a request, unless invalidate() was called
+    # The request is conditional, so unchanged rates come back as an empty 304 and the rates already held are reused
+    # A 304 with no rates left to reuse is retried once without the conditional headers
+    # A fetched response counts as successful even when it cannot be written to the disk cache
+    # If the request fails, the last good rates in memory are preferred over re-reading the disk cache
     def fetch_exchange_rates(self):
+        if self.has_fresh_rates():
+            return self._cached_rates
+        if self._cached_rates is None and not self._force_refresh:
+            todays_rates = self._read_todays_cache()
+            if todays_rates:
+                self._cached_rates = todays_rates
+                self._fetch_ts = time.monotonic()
+                return self._cached_rates
         try:
-            url = f"https://api.exchangerate-api.com/v4/latest/USD?apiKey={self.api_key}"
-            response = requests.get(url)
-            data = response.json()
-            with open(self.cache_file, 'w') as file:
-                json.dump(data, file)
-            return data['rates'], data['date']
-        except Exception as e:
+            url = f"https://api.exchangerate-api.com/v4/latest/{BASE_CURRENCY}?apiKey={self.api_key}"
+            response = self.session.get(url, headers=self._conditional_headers(), timeout=REQUEST_TIMEOUT)
+            held_rates = self._held_rates() if response.status_code == 304 else None
+            data = None
+            if held_rates:
+                self._cached_rates = held_rates
+            else:
+                if response.status_code == 304:
+                    response = self.session.get(url, timeout=REQUEST_TIMEOUT)
+                response.raise_for_status()
+                data = _loads(response.content)
+                self._cached_rates = self._extract_rates_and_date(data)
+                cache_meta = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                }
+            self._fetch_ts = time.monotonic()
+            self._force_refresh = False
+            if data is not None:
+                self._store_response(data, cache_meta)
+            return self._cached_rates
+        except (requests.exceptions.RequestException, OSError, ValueError, KeyError, TypeError):
+            if self._cached_rates is not None:
+                return self._cached_rates
             try:
-                with open(self.cache_file, 'r') as file:
-                    data = json.load(file)
-                return data['rates'], data['date']
-            except Exception as e:
+                return self._read_cache()
+            except (OSError, ValueError, KeyError, TypeError) as e:
                 print("Error fetching exchange rates: ", e)
-                return {}
\ No newline at end of file
+                return {}, ""
+
+    # Save a fetched response with its validators, keeping the validators only once the write succeeded
+    # A failed write is reported but does not fail the fetch that produced the response
+    def _store_response(self, data, cache_meta):
+        data['_cache_meta'] = cache_meta
+        try:
+            self._save_cache(data)
+        except OSError as e:
+            print("Error saving exchange rates cache: ", e)
+            return
+        self._cache_meta = cache_meta
+
+    # Write the raw API response to the disk cache
+    # The data goes to a temporary file that then replaces the cache, so a crash never leaves a torn file
+    # Nothing is written when the encoded data matches what the cache file already holds
+    # The temporary file gets the mode a plainly opened file would have, not mkstemp's owner-only 0600
+    def _save_cache(self, data):
+        payload = _dumps(data)
+        payload_hash = _content_hash(payload)
+        if payload_hash == self._cache_hash:
+            return
+        cache_dir = os.path.dirname(os.path.abspath(self.cache_file))
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.exchange_rates_', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(payload)
+            os.chmod(tmp_path, self._cache_file_mode())
+            os.replace(tmp_path, self.cache_file)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._cache_hash = payload_hash
+
+    # Mode for the cache file: the current file's mode, or the default for new files under the umask
+    def _cache_file_mode(self):
+        try:
+            return stat.S_IMODE(os.stat(self.cache_file).st_mode)
+        except OSError:
+            return 0o666 & ~_UMASK
+
+    # Read the raw cached API response, remembering the validators saved with it
+    def _read_cache_data(self):
+        with open(self.cache_file, 'rb') as file:
+            payload = file.read()
+        self._cache_hash = _content_hash(payload)
+        data = _loads(payload)
+        self._cache_meta = data.get('_cache_meta') if isinstance(data, dict) else None
+        return data
+
+    # Build If-None-Match / If-Modified-Since headers from the validators of the rates held
+    def _conditional_headers(self):
+        meta = self._cache_meta
+        if not isinstance(meta, dict):
+            return {}
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    # Return the rates held in memory, else those in the disk cache, else None
+    def _held_rates(self):
+        if self._cached_rates is not None:
+            return self._cached_rates
+        try:
+            return self._read_cache()
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    # Read the rates and their date from the disk cache
+    def _read_cache(self):
+        return self._extract_rates_and_date(self._read_cache_data())
+
+    # Pull the rates and their date out of an API response, coercing every rate to float once
+    # A response whose rates are not a currency -> rate mapping is rejected with ValueError
+    def _extract_rates_and_date(self, data):
+        if not isinstance(data, dict) or not isinstance(data.get('rates'), dict):
+            raise ValueError("Exchange rates response has no rates mapping")
+        rates = {currency: float(rate) for currency, rate in data['rates'].items()}
+        return rates, data['date']
+
+    # Return the cached rates if they were published today (UTC), otherwise None
+    def _read_todays_cache(self):
+        try:
+            rates, update_date = self._read_cache()
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if update_date != datetime.now(timezone.utc).date().isoformat():
+            return None
+        return rates, update_date
\ No newline at end of file
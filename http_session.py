@@ -0,0 +1,20 @@
+import functools
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Build a new HTTP session with the client's headers, retry policy and connection pool
+def create_session():
+    session = requests.Session()
+    session.headers['User-Agent'] = 'CurrencyConverter/1.0'
+    # The GUI waits on every request, so retries stay few: two for failed connections,
+    # one for a transient 502/503/504, which comes back quickly
+    retries = Retry(total=3, connect=2, read=0, status=1, backoff_factor=0.3,
+                    status_forcelist=(502, 503, 504))
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries))
+    return session
+
+# Return the process-wide HTTP session, for API clients that should share one connection pool
+@functools.lru_cache(maxsize=1)
+def get_session():
+    return create_session()
@@ -1,12 +1,14 @@
 # Import required modules
 import sys
-from PyQt6.QtWidgets import QApplication
-from currency_converter import CurrencyConverter
 import get_api
 
 # Define the main function to set up and run the application
+# PyQt6 is imported here so importing this module does not load the GUI stack
 def main():
+    from PyQt6.QtWidgets import QApplication
+    from currency_converter import CurrencyConverter, STYLE_SHEET
     app = QApplication(sys.argv)
+    app.setStyleSheet(STYLE_SHEET)
     api_key = get_api.get_api()
     ex = CurrencyConverter(api_key)
     ex.show()